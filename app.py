@@ -1,9 +1,11 @@
 import os
+import uuid
 import logging
-from flask import Flask, render_template, request, jsonify, session, send_from_directory, abort
-from commands import CommandHandler
+from flask import Flask, Response, render_template, request, jsonify, session, send_from_directory, abort, stream_with_context
+from commands import CommandHandler, is_error_output
 from system_monitor import SystemMonitor
 from ai_handler import AIHandler
+from archive import ARCHIVE_TYPES, QuotaExceededError
 from datetime import timedelta
 from flask_cors import CORS
 
@@ -25,6 +27,12 @@ def create_app():
     system_monitor = SystemMonitor()
     ai_handler = AIHandler()
 
+    def history_session():
+        # Per-browser-session key for server-side command history and the AI interaction log
+        if 'sid' not in session:
+            session['sid'] = uuid.uuid4().hex
+        return session['sid']
+
     @app.route('/')
     def index():
         # Always start in sandbox for new session
@@ -41,30 +49,64 @@ def create_app():
         if 'cwd' not in session or not session['cwd'].startswith(command_handler.sandbox_dir):
             session['cwd'] = command_handler.sandbox_dir
         cwd = session['cwd']
+        sid = history_session()
+        terminal = str(data.get('terminal', '1'))
         if ai_mode:
-            ai_result = ai_handler.interpret(user_input)
+            ai_result = ai_handler.interpret(user_input, sid)
             print(f"[DEBUG] AIHandler result: {ai_result}")
             if ai_result['interpreted'] and 'commands' in ai_result:
                 outputs = []
                 for cmd in ai_result['commands']:
                     print(f"[DEBUG] Executing AI command: {cmd}")
-                    out = command_handler.execute(cmd, cwd)
+                    out = command_handler.execute(cmd, cwd, sid, terminal)
                     print(f"[DEBUG] Output: {out}")
                     outputs.append(f"$ {cmd}\n{out}")
                     session['cwd'] = command_handler.current_dir
                     cwd = session['cwd']
                 ai_result['output'] = '\n\n'.join(outputs)
+                ai_result['history_id'] = record_history(data, sid, terminal, rank=False)
+                ai_result['history_cleared'] = any(clears_history(cmd) for cmd in ai_result['commands'])
                 return jsonify(ai_result)
             # AI failed to interpret
-            output = command_handler.execute(user_input, cwd)
+            output = command_handler.execute(user_input, cwd, sid, terminal)
             print(f"[DEBUG] AI fallback output: {output}")
             session['cwd'] = command_handler.current_dir
-            return jsonify({'interpreted': False, 'command': user_input, 'output': output})
+            history_id = record_history(data, sid, terminal, rank=False)
         else:
-            output = command_handler.execute(user_input, cwd)
+            output = command_handler.execute(user_input, cwd, sid, terminal)
             print(f"[DEBUG] Direct command output: {output}")
             session['cwd'] = command_handler.current_dir
-            return jsonify({'interpreted': False, 'command': user_input, 'output': output})
+            history_id = record_history(data, sid, terminal, rank=not is_error_output(output))
+        return jsonify({'interpreted': False, 'command': user_input, 'output': output, 'history_id': history_id,
+                        'history_cleared': clears_history(user_input)})
+
+    def clears_history(command):
+        # Lets the client reset its local history without matching on output text
+        return command.split('|', 1)[0].split() == ['history', '-c']
+
+    def record_history(data, sid, terminal, rank=True):
+        # Recorded after the command runs so `history -s` never finds its own invocation.
+        # Only successful classic-mode commands are ranked; AI prompts and failures stay out of autocomplete.
+        if not data.get('record', False):
+            return None
+        command = data.get('command', '')
+        rank = rank and command.split(maxsplit=1)[:1] != ['history']
+        return command_handler.history.add(sid, terminal, command, rank=rank)
+
+    @app.route('/history')
+    def history():
+        terminal = request.args.get('terminal', '1')
+        after = request.args.get('after', 0, type=int)
+        limit = min(request.args.get('limit', 1000, type=int), 5000)
+        entries = command_handler.history.since(history_session(), terminal, after, limit)
+        return jsonify({'entries': entries})
+
+    @app.route('/history/search')
+    def history_search():
+        query = request.args.get('q', '')
+        limit = min(request.args.get('limit', 10, type=int), 100)
+        results = command_handler.history.search(history_session(), query, limit)
+        return jsonify({'results': results})
 
     @app.route('/health')
     def health():
@@ -108,11 +150,48 @@ def create_app():
         except Exception:
             return 'Unable to preview file.', 500
 
+    @app.route('/download')
+    def download():
+        # Streams a tar/tgz/zip of a sandbox subtree with chunked transfer encoding
+        rel_path = request.args.get('path', '')
+        fmt = request.args.get('format', 'tgz')
+        if fmt not in ARCHIVE_TYPES:
+            abort(400)
+        # Validate eagerly: stream() is lazy, so errors inside it would surface only after a 200 was sent
+        try:
+            real_path = command_handler.archives.check_path(os.path.join(command_handler.sandbox_dir, rel_path))
+        except PermissionError:
+            abort(403)
+        if not os.path.exists(real_path):
+            abort(404)
+        ext, mimetype = ARCHIVE_TYPES[fmt]
+        name = 'sandbox' if real_path == command_handler.archives.sandbox_dir else os.path.basename(real_path)
+        chunks = command_handler.archives.stream(real_path, fmt)
+        return Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename="{name}{ext}"'})
+
+    @app.route('/upload', methods=['POST', 'PUT'])
+    def upload():
+        # Extracts a tar/tgz/zip request body into a sandbox directory as it arrives
+        rel_path = request.args.get('path', '')
+        abs_path = os.path.abspath(os.path.join(command_handler.sandbox_dir, rel_path))
+        if not abs_path.startswith(command_handler.sandbox_dir):
+            abort(403)
+        try:
+            entries, size = command_handler.archives.extract(request.stream, abs_path)
+        except PermissionError as e:
+            return jsonify({'error': str(e)}), 403
+        except QuotaExceededError as e:
+            return jsonify({'error': str(e)}), 413
+        except Exception as e:
+            return jsonify({'error': f'Invalid archive: {e}'}), 400
+        return jsonify({'status': 'ok', 'entries': entries, 'bytes': size})
+
     @app.route('/ai_suggest', methods=['POST'])
     def ai_suggest():
         data = request.get_json()
         user_input = data.get('input', '')
-        ai_result = ai_handler.interpret(user_input)
+        ai_result = ai_handler.interpret(user_input, history_session())
         print(f"[DEBUG] /ai_suggest input: {user_input}, ai_result: {ai_result}")
         suggestion = ''
         if ai_result.get('interpreted') and ai_result.get('commands'):
@@ -127,6 +206,14 @@ def create_app():
         print(f"[DEBUG] /ai_prompt_suggest input: {user_input}, suggestion: {suggestion}")
         return jsonify({'suggestion': suggestion})
 
+    @app.route('/ai_log')
+    def ai_log():
+        # Only this session's entries; sampled raw Gemini payloads stay in the operator-side JSONL file
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        entries = [{k: v for k, v in entry.items() if k not in ('raw', 'session')}
+                   for entry in ai_handler.log.recent(limit, history_session())]
+        return jsonify({'entries': entries, 'dropped': ai_handler.log.dropped})
+
     @app.route('/sysstats')
     def sysstats():
         stats = system_monitor.get_stats()
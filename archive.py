@@ -0,0 +1,465 @@
+import os
+import stat
+import zlib
+import struct
+import tarfile
+import zipfile
+
+# --- Streaming tar/zip export and import for the sandbox: constant memory, no temp files ---
+
+SANDBOX_QUOTA_BYTES = int(os.environ.get('SANDBOX_QUOTA_BYTES', 200 * 1024 * 1024))
+ARCHIVE_MAX_ENTRIES = int(os.environ.get('ARCHIVE_MAX_ENTRIES', 10000))
+CHUNK_SIZE = 64 * 1024
+
+# format -> (file extension, mimetype)
+ARCHIVE_TYPES = {
+    'tar': ('.tar', 'application/x-tar'),
+    'tgz': ('.tar.gz', 'application/gzip'),
+    'zip': ('.zip', 'application/zip'),
+}
+
+ZIP_LOCAL_HEADER = b'PK\x03\x04'
+ZIP_DATA_DESCRIPTOR = b'PK\x07\x08'
+ZIP_END_OF_CENTRAL_DIR = b'PK\x05\x06'
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+class ArchiveManager:
+    def __init__(self, sandbox_dir, quota_bytes=SANDBOX_QUOTA_BYTES, max_entries=ARCHIVE_MAX_ENTRIES):
+        self.sandbox_dir = os.path.realpath(sandbox_dir)
+        self.quota_bytes = quota_bytes
+        self.max_entries = max_entries
+
+    # ---- export ----
+
+    def stream(self, path, fmt='tgz', exclude=()):
+        # Yields archive bytes chunk by chunk; nothing is buffered beyond one chunk.
+        # `exclude` is a collection of real paths to leave out.
+        if fmt == 'zip':
+            return self._stream_zip(path, exclude)
+        if fmt in ('tar', 'tgz'):
+            chunks = self._stream_tar(path, exclude)
+            return _gzip(chunks) if fmt == 'tgz' else chunks
+        raise ValueError(f'Unsupported archive format: {fmt}')
+
+    def write(self, path, out_path, fmt):
+        # Build an archive of `path` at `out_path`, both inside the sandbox, counting against the quota.
+        # The source is validated before anything is written, and the archive is streamed into a
+        # .part sibling that replaces `out_path` only on success, so a failure never destroys a file.
+        path = self.check_path(path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(os.path.relpath(path, self.sandbox_dir))
+        out_path = self.check_path(out_path)
+        part = _part_path(out_path)
+        budget = _Budget(self._remaining_bytes(), self.max_entries)
+        try:
+            with open(part, 'wb') as f:
+                for chunk in self.stream(path, fmt, exclude=(out_path, part)):
+                    budget.consume(len(chunk))
+                    f.write(chunk)
+            os.replace(part, out_path)
+        except BaseException:
+            _remove_quietly(part)
+            raise
+        return budget.used
+
+    def _walk(self, path, exclude=()):
+        # (abs_path, arcname, is_dir) for the subtree, skipping symlinks and anything outside the sandbox
+        path = self.check_path(path)
+        base = os.path.basename(path.rstrip(os.sep)) or '.'
+        if os.path.isfile(path):
+            yield path, base, False
+            return
+        if not os.path.isdir(path):
+            raise FileNotFoundError(path)
+        # Archiving the whole sandbox puts its contents at the top level instead of under the temp dir name
+        parent = path if path == self.sandbox_dir else os.path.dirname(path)
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not os.path.islink(os.path.join(root, d)))
+            if root != parent:
+                yield root, os.path.relpath(root, parent).replace(os.sep, '/'), True
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                if os.path.islink(full) or full in exclude or not os.path.isfile(full):
+                    continue
+                yield full, os.path.relpath(full, parent).replace(os.sep, '/'), False
+
+    def _stream_tar(self, path, exclude):
+        written = 0
+        for full, arcname, is_dir in self._walk(path, exclude):
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            info = tarfile.TarInfo(arcname + '/' if is_dir else arcname)
+            info.mtime = int(st.st_mtime)
+            info.mode = stat.S_IMODE(st.st_mode)
+            if is_dir:
+                info.type = tarfile.DIRTYPE
+                header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+                written += len(header)
+                yield header
+                continue
+            try:
+                f = open(full, 'rb')
+            except OSError:
+                continue
+            with f:
+                # The header promises st_size bytes; pad or truncate if the file changes underneath us
+                info.size = st.st_size
+                header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+                written += len(header)
+                yield header
+                remaining = info.size
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        chunk = tarfile.NUL * min(CHUNK_SIZE, remaining)
+                    remaining -= len(chunk)
+                    yield chunk
+                padding = -info.size % tarfile.BLOCKSIZE
+                written += info.size + padding
+                if padding:
+                    yield tarfile.NUL * padding
+        # End-of-archive marker, padded to a full record like tarfile does
+        trailer = tarfile.BLOCKSIZE * 2
+        trailer += -(written + trailer) % tarfile.RECORDSIZE
+        yield tarfile.NUL * trailer
+
+    def _stream_zip(self, path, exclude):
+        buf = _ChunkBuffer()
+        with zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for full, arcname, is_dir in self._walk(path, exclude):
+                try:
+                    info = zipfile.ZipInfo.from_file(full, arcname, strict_timestamps=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    zf.writestr(info, b'')
+                    yield from buf.drain()
+                    continue
+                info.compress_type = zipfile.ZIP_DEFLATED
+                try:
+                    f = open(full, 'rb')
+                except OSError:
+                    continue
+                with f, zf.open(info, 'w') as dst:
+                    while True:
+                        chunk = f.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        yield from buf.drain()
+                yield from buf.drain()
+        yield from buf.drain()
+
+    # ---- import ----
+
+    def extract(self, stream, dest):
+        # Sniff the format from the first bytes, then extract member by member straight from the stream
+        dest = self.check_path(dest)
+        reader = _StreamReader(stream)
+        magic = reader.read_exact(4)
+        reader.unread(magic)
+        budget = _Budget(self._remaining_bytes(), self.max_entries)
+        if magic == ZIP_LOCAL_HEADER:
+            members = _iter_zip_stream(reader)
+        elif magic == ZIP_END_OF_CENTRAL_DIR:
+            # A zip with no entries is just the end-of-central-directory record
+            members = ()
+        else:
+            members = self._iter_tar(tarfile.open(fileobj=reader, mode='r|*'))
+        return self._extract_all(dest, members, budget)
+
+    def extract_file(self, archive_path, dest):
+        # On-disk zips are seekable, so read them through zipfile; everything else goes through the stream path
+        if zipfile.is_zipfile(archive_path):
+            dest = self.check_path(dest)
+            budget = _Budget(self._remaining_bytes(), self.max_entries)
+            with zipfile.ZipFile(archive_path) as zf:
+                members = ((info.filename, info.is_dir(), () if info.is_dir() else _read_chunks(zf.open(info)))
+                           for info in zf.infolist())
+                return self._extract_all(dest, members, budget)
+        with open(archive_path, 'rb') as f:
+            return self.extract(f, dest)
+
+    def list_file(self, archive_path):
+        if zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as zf:
+                return [(info.filename, info.file_size) for info in zf.infolist()]
+        with tarfile.open(archive_path, 'r|*') as tar:
+            return [(m.name + ('/' if m.isdir() else ''), m.size) for m in tar]
+
+    def _iter_tar(self, tar):
+        with tar:
+            for member in tar:
+                if member.isdir():
+                    yield member.name, True, ()
+                elif member.isfile():
+                    yield member.name, False, _read_chunks(tar.extractfile(member))
+                # Symlinks, hard links and device nodes are never extracted into the sandbox
+
+    def _extract_all(self, dest, members, budget):
+        # Track every file and directory this extraction creates, so a traversal entry, quota or CRC
+        # failure at entry N removes entries 1..N-1 too. Pre-existing files are only ever replaced
+        # by a fully verified member, never truncated or deleted.
+        created = []
+        try:
+            _makedirs(dest, created)
+            for name, is_dir, chunks in members:
+                self._extract_member(dest, name, is_dir, chunks, budget, created)
+        except BaseException:
+            for path in reversed(created):
+                if os.path.isdir(path):
+                    _rmdir_quietly(path)
+                else:
+                    _remove_quietly(path)
+            raise
+        return budget.entries, budget.used
+
+    def _extract_member(self, dest, name, is_dir, chunks, budget, created):
+        target = self._member_path(dest, name)
+        budget.add_entry()
+        if is_dir or name.endswith('/'):
+            _makedirs(target, created)
+            return
+        _makedirs(os.path.dirname(target), created)
+        # Stream into a sibling .part file and swap it in only once quota and CRC checks have passed
+        part = _part_path(target)
+        try:
+            with open(part, 'wb') as f:
+                for chunk in chunks:
+                    budget.consume(len(chunk))
+                    f.write(chunk)
+            existed = os.path.exists(target)
+            os.replace(part, target)
+        except BaseException:
+            _remove_quietly(part)
+            raise
+        if not existed:
+            created.append(target)
+
+    def _member_path(self, dest, name):
+        name = name.replace('\\', '/')
+        # Check the unresolved path: after realpath() a symlink would already have been followed
+        if os.path.islink(os.path.join(dest, name.rstrip('/'))):
+            raise PermissionError(f'Refusing to write through symlink: {name}')
+        target = os.path.realpath(os.path.join(dest, name))
+        if name.startswith('/') or not _is_within(target, dest):
+            raise PermissionError(f'Archive entry escapes the sandbox: {name}')
+        return target
+
+    def check_path(self, path):
+        real = os.path.realpath(path)
+        if not _is_within(real, self.sandbox_dir):
+            raise PermissionError(f'You can only access files and folders inside your sandbox ("~"). Current sandbox root: {self.sandbox_dir}')
+        return real
+
+    def _remaining_bytes(self):
+        used = 0
+        for root, dirs, files in os.walk(self.sandbox_dir):
+            for name in files:
+                try:
+                    used += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    continue
+        return max(self.quota_bytes - used, 0)
+
+
+class _Budget:
+    def __init__(self, max_bytes, max_entries):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.used = 0
+        self.entries = 0
+
+    def consume(self, n):
+        self.used += n
+        if self.used > self.max_bytes:
+            raise QuotaExceededError(f'Sandbox quota exceeded ({self.max_bytes} bytes available)')
+
+    def add_entry(self):
+        self.entries += 1
+        if self.entries > self.max_entries:
+            raise QuotaExceededError(f'Archive has more than {self.max_entries} entries')
+
+
+class _ChunkBuffer:
+    # Unseekable sink for ZipFile; zipfile falls back to data descriptors when it cannot seek
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+class _StreamReader:
+    # File-like wrapper over a request body with push-back, so headers can be sniffed and over-reads returned
+    def __init__(self, stream):
+        self._stream = stream
+        self._pending = b''
+
+    def read(self, n=-1):
+        if self._pending:
+            if n < 0 or n >= len(self._pending):
+                data, self._pending = self._pending, b''
+                return data
+            data, self._pending = self._pending[:n], self._pending[n:]
+            return data
+        return self._stream.read(n)
+
+    def read_exact(self, n):
+        data = b''
+        while len(data) < n:
+            chunk = self.read(n - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def unread(self, data):
+        if data:
+            self._pending = data + self._pending
+
+
+def _iter_zip_stream(reader):
+    # Walk local file headers in order; the central directory at the end is never needed
+    while True:
+        signature = reader.read_exact(4)
+        if signature != ZIP_LOCAL_HEADER:
+            return
+        header = reader.read_exact(26)
+        if len(header) < 26:
+            raise ValueError('Truncated zip archive')
+        _, flags, method, _, _, crc, csize, usize, name_len, extra_len = struct.unpack('<HHHHHIIIHH', header)
+        raw_name = reader.read_exact(name_len)
+        extra = reader.read_exact(extra_len)
+        name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+        zip64 = _zip64_sizes(extra, csize, usize)
+        if zip64:
+            csize, usize = zip64
+        if flags & 0x1:
+            raise ValueError(f'Encrypted zip entries are not supported: {name}')
+        if method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise ValueError(f'Unsupported zip compression method {method}: {name}')
+        # Directory entries are empty, so only stored *files* with data descriptors are ambiguous
+        if method == zipfile.ZIP_STORED and flags & 0x8 and not name.endswith('/'):
+            raise ValueError(f'Stored zip entries with data descriptors cannot be streamed: {name}')
+        chunks = _zip_member_chunks(reader, name, flags, method, crc, csize, bool(zip64))
+        yield name, name.endswith('/'), chunks
+        # Drain whatever the consumer did not read so the next header lines up
+        for _ in chunks:
+            pass
+
+
+def _zip_member_chunks(reader, name, flags, method, crc, csize, zip64):
+    actual_crc = 0
+    if method == zipfile.ZIP_STORED:
+        remaining = csize
+        while remaining > 0:
+            chunk = reader.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError(f'Truncated zip archive: {name}')
+            remaining -= len(chunk)
+            actual_crc = zlib.crc32(chunk, actual_crc)
+            yield chunk
+    else:
+        # Bound each decompress() call so a zip bomb cannot inflate far past one chunk at a time
+        d = zlib.decompressobj(-15)
+        while not d.eof:
+            data = reader.read(CHUNK_SIZE)
+            if not data:
+                raise ValueError(f'Truncated zip archive: {name}')
+            out = d.decompress(data, CHUNK_SIZE)
+            while out:
+                actual_crc = zlib.crc32(out, actual_crc)
+                yield out
+                if d.eof:
+                    break
+                out = d.decompress(d.unconsumed_tail, CHUNK_SIZE)
+        reader.unread(d.unused_data)
+    if flags & 0x8:
+        descriptor = reader.read_exact(4)
+        if descriptor == ZIP_DATA_DESCRIPTOR:
+            descriptor = reader.read_exact(4)
+        crc = struct.unpack('<I', descriptor)[0]
+        reader.read_exact(16 if zip64 else 8)
+    if actual_crc != crc:
+        raise ValueError(f'CRC mismatch in zip entry: {name}')
+
+
+def _zip64_sizes(extra, csize, usize):
+    while len(extra) >= 4:
+        header_id, size = struct.unpack('<HH', extra[:4])
+        data = extra[4:4 + size]
+        if header_id == 0x0001:
+            if usize == 0xFFFFFFFF and len(data) >= 8:
+                usize, data = struct.unpack('<Q', data[:8])[0], data[8:]
+            if csize == 0xFFFFFFFF and len(data) >= 8:
+                csize = struct.unpack('<Q', data[:8])[0]
+            return csize, usize
+        extra = extra[4 + size:]
+    return None
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _read_chunks(f):
+    with f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _is_within(path, root):
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def _makedirs(path, created):
+    # os.makedirs, but records each directory it actually creates
+    missing = []
+    while not os.path.isdir(path):
+        missing.append(path)
+        path = os.path.dirname(path)
+    for path in reversed(missing):
+        os.mkdir(path)
+        created.append(path)
+
+
+def _rmdir_quietly(path):
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass
+
+
+def _part_path(path):
+    head, tail = os.path.split(path)
+    return os.path.join(head, f'.{tail}.part')
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -4,8 +4,17 @@ import tempfile
 import re
 from datetime import datetime
 from system_monitor import SystemMonitor
+from history_store import HistoryStore
+from archive import ArchiveManager
 import platform
 
+# Output prefixes that mean the command did not run successfully
+ERROR_PREFIXES = ('Unknown command:', 'Usage:', 'Error:', 'Permission denied:', 'File not found:')
+
+
+def is_error_output(output):
+    return output.startswith(ERROR_PREFIXES)
+
 
 class CommandHandler:
     def __init__(self):
@@ -13,6 +22,8 @@ class CommandHandler:
         self.current_dir = self.sandbox_dir
         self._populate_demo_environment()
         self.sysmon = SystemMonitor()
+        self.history = HistoryStore()
+        self.archives = ArchiveManager(self.sandbox_dir)
 
     def _populate_demo_environment(self):
         # Create demo folders and files
@@ -55,7 +66,7 @@ class CommandHandler:
             raise PermissionError(f'You can only access files and folders inside your sandbox ("~"). Current sandbox root: {sandbox_root}')
         return abs_path
 
-    def execute(self, command, cwd=None):
+    def execute(self, command, cwd=None, session=None, terminal=None):
         self.current_dir = cwd or self.sandbox_dir
         try:
             # Minimal support for 'ls -l | grep ...'
@@ -63,7 +74,7 @@ class CommandHandler:
                 left, right = [x.strip() for x in command.split('|', 1)]
                 if right.startswith('grep '):
                     pattern = right[5:].strip().strip('"\'')
-                    left_output = self.execute(left, self.current_dir)
+                    left_output = self.execute(left, self.current_dir, session, terminal)
                     filtered = '\n'.join([line for line in left_output.split('\n') if pattern in line])
                     return filtered if filtered else '[No matches]'
                 else:
@@ -119,6 +130,12 @@ class CommandHandler:
                 return self._tree(arg)
             elif cmd in ['nano', 'open']:
                 return self._edit(arg)
+            elif cmd == 'tar':
+                return self._tar(arg)
+            elif cmd == 'zip':
+                return self._zip(arg)
+            elif cmd == 'unzip':
+                return self._unzip(arg)
             # System/user info
             elif cmd == 'whoami':
                 return os.environ.get('USER', os.environ.get('USERNAME', 'user'))
@@ -146,19 +163,19 @@ class CommandHandler:
                 if '%PATH%' in arg:
                     return os.environ.get('PATH', '')
                 return arg
+            elif cmd == 'history':
+                return self._history(arg, session, terminal)
             elif cmd == 'date':
                 return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             # Process/monitoring
             elif cmd in ['ps']:
-                if 'aux' in arg:
-                    return self.sysmon.ps()
-                return self.sysmon.ps()
+                return self._ps(arg)
             elif cmd == 'tasklist':
                 return self.sysmon.ps()
             elif cmd == 'top':
-                return self.sysmon.top()
+                return self._top(arg)
             elif cmd == 'htop':
-                return 'htop is not installed. Showing top instead.\n' + self.sysmon.top()
+                return 'htop is not installed. Showing top instead.\n' + self._top(arg)
             elif cmd == 'kill':
                 return self._kill(arg)
             elif cmd == 'taskkill':
@@ -324,6 +341,116 @@ class CommandHandler:
             content = f.read()
         return f'--- {arg} ---\n{content}\n[Editing not supported in web UI. Use cat/type to view.]'
 
+    def _top(self, arg):
+        # top [-n N] [-o cpu|mem]
+        n, sort = 5, 'cpu'
+        parts = arg.split()
+        for i, part in enumerate(parts):
+            value = parts[i + 1] if i + 1 < len(parts) else ''
+            if part == '-n':
+                if not value.isdigit():
+                    return 'Usage: top [-n N] [-o cpu|mem]'
+                n = int(value)
+            elif part == '-o':
+                if value not in ('cpu', 'mem'):
+                    return 'Usage: top [-n N] [-o cpu|mem]'
+                sort = value
+        return self.sysmon.top(n, sort)
+
+    def _ps(self, arg):
+        # ps [aux] [-C name] [--sort cpu|mem]
+        name, sort = None, None
+        parts = arg.replace('--sort=', '--sort ').split()
+        for i, part in enumerate(parts):
+            value = parts[i + 1] if i + 1 < len(parts) else ''
+            if part == '-C':
+                if not value:
+                    return 'Usage: ps [aux] [-C name] [--sort cpu|mem]'
+                name = value
+            elif part == '--sort':
+                value = value.lstrip('-%')
+                if value not in ('cpu', 'mem'):
+                    return 'Usage: ps [aux] [-C name] [--sort cpu|mem]'
+                sort = value
+        return self.sysmon.ps(name, sort)
+
+    def _history(self, arg, session, terminal):
+        if not session:
+            return 'History is not available for this session.'
+        parts = arg.split(maxsplit=1)
+        flag = parts[0] if parts else ''
+        rest = parts[1].strip() if len(parts) > 1 else ''
+        if flag == '-c':
+            self.history.clear(session)
+            return 'History cleared.'
+        if flag == '-s':
+            if not rest:
+                return 'Usage: history -s <query>'
+            matches = self.history.search(session, rest, limit=20)
+            lines = [f"{m['count']:>6}  {m['command']}" for m in matches]
+            return '\n'.join(lines) if lines else '[No matches]'
+        if flag == '-f':
+            limit = int(rest) if rest.isdigit() else 20
+            lines = [f"{m['count']:>6}  {m['command']}" for m in self.history.frequent(session, limit)]
+            return '\n'.join(lines) if lines else '[No history]'
+        if flag and not flag.isdigit():
+            return 'Usage: history [n] | history -f [n] | history -s <query> | history -c'
+        limit = int(flag) if flag else 20
+        rows = self.history.recent(session, terminal, limit)
+        lines = [f'{hid:>6}  {command}' for hid, command, ts in rows]
+        return '\n'.join(lines) if lines else '[No history]'
+
+    def _tar(self, arg):
+        usage = 'Usage: tar -c[z]f <archive> <path> | tar -xf <archive> [-C <dir>] | tar -tf <archive>'
+        parts = arg.split()
+        if len(parts) < 2 or 'f' not in parts[0]:
+            return usage
+        flags, archive, rest = parts[0].lstrip('-'), parts[1], parts[2:]
+        if 'c' in flags:
+            if len(rest) != 1:
+                return usage
+            fmt = 'tgz' if 'z' in flags or archive.endswith(('.tgz', '.tar.gz')) else 'tar'
+            size = self.archives.write(self._safe_path(rest[0]), self._safe_path(archive), fmt)
+            return f'Created {archive} ({size} bytes)'
+        if 'x' in flags:
+            if rest and (len(rest) != 2 or rest[0] != '-C'):
+                return usage
+            return self._extract(archive, rest[1] if rest else '.')
+        if 't' in flags:
+            return self._list_archive(archive)
+        return usage
+
+    def _zip(self, arg):
+        parts = [p for p in arg.split() if p != '-r']
+        if len(parts) != 2:
+            return 'Usage: zip -r <archive.zip> <path>'
+        size = self.archives.write(self._safe_path(parts[1]), self._safe_path(parts[0]), 'zip')
+        return f'Created {parts[0]} ({size} bytes)'
+
+    def _unzip(self, arg):
+        parts = arg.split()
+        if parts and parts[0] == '-l' and len(parts) == 2:
+            return self._list_archive(parts[1])
+        if len(parts) == 1:
+            return self._extract(parts[0], '.')
+        if len(parts) == 3 and parts[1] == '-d':
+            return self._extract(parts[0], parts[2])
+        return 'Usage: unzip <archive.zip> [-d <dir>] | unzip -l <archive.zip>'
+
+    def _extract(self, archive, dest):
+        path = self._safe_path(archive)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(archive)
+        entries, size = self.archives.extract_file(path, self._safe_path(dest))
+        return f'Extracted {entries} entries ({size} bytes) to {dest}'
+
+    def _list_archive(self, archive):
+        path = self._safe_path(archive)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(archive)
+        lines = [f'{size:>10}  {name}' for name, size in self.archives.list_file(path)]
+        return '\n'.join(lines) if lines else '[Empty archive]'
+
     def _welcome(self):
         return 'Welcome to your sandboxed terminal. Type commands below.'
 
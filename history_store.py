@@ -0,0 +1,146 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+
+# --- Server-side command history: append-only SQLite log + trigram FTS index over distinct commands ---
+
+HISTORY_DB_PATH = os.environ.get('HISTORY_DB_PATH', os.path.join(tempfile.gettempdir(), 'pyterminal_history.db'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    terminal TEXT NOT NULL,
+    command TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_terminal ON history(session, terminal, id);
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    command TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    UNIQUE(session, command)
+);
+CREATE INDEX IF NOT EXISTS commands_rank ON commands(session, count DESC, last_used DESC);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS commands_fts USING fts5(command, content='commands', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS commands_ai AFTER INSERT ON commands BEGIN
+    INSERT INTO commands_fts(rowid, command) VALUES (new.id, new.command);
+END;
+CREATE TRIGGER IF NOT EXISTS commands_ad AFTER DELETE ON commands BEGIN
+    INSERT INTO commands_fts(commands_fts, rowid, command) VALUES ('delete', old.id, old.command);
+END;
+"""
+
+# Subsequence ("fuzzy") fallback only looks at this many of the most used commands
+FUZZY_SCAN_LIMIT = 5000
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5/trigram: fall back to LIKE scans over distinct commands
+            print(f"[HistoryStore] [WARN] FTS5 trigram index unavailable, using LIKE search: {e}")
+            self.fts = False
+        self._conn.commit()
+
+    def add(self, session, terminal, command, rank=True):
+        # rank=False keeps the entry out of the frequency table used for search and autocomplete
+        command = command.strip()
+        if not command:
+            return None
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                'INSERT INTO history(session, terminal, command, ts) VALUES (?, ?, ?, ?)',
+                (session, str(terminal), command, now))
+            if rank:
+                self._conn.execute(
+                    'INSERT INTO commands(session, command, count, last_used) VALUES (?, ?, 1, ?) '
+                    'ON CONFLICT(session, command) DO UPDATE SET count = count + 1, last_used = excluded.last_used',
+                    (session, command, now))
+            self._conn.commit()
+            return cur.lastrowid
+
+    def since(self, session, terminal, after=0, limit=1000):
+        # Delta sync: the newest entries the client has not seen yet, oldest first
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, command FROM history WHERE session = ? AND terminal = ? AND id > ? ORDER BY id DESC LIMIT ?',
+                (session, str(terminal), after, limit)).fetchall()
+        return [{'id': r[0], 'command': r[1]} for r in reversed(rows)]
+
+    def recent(self, session, terminal, limit=20):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, command, ts FROM history WHERE session = ? AND terminal = ? ORDER BY id DESC LIMIT ?',
+                (session, str(terminal), limit)).fetchall()
+        return list(reversed(rows))
+
+    def frequent(self, session, limit=20):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT command, count FROM commands WHERE session = ? ORDER BY count DESC, last_used DESC LIMIT ?',
+                (session, limit)).fetchall()
+        return [{'command': r[0], 'count': r[1]} for r in rows]
+
+    def search(self, session, query, limit=10):
+        query = query.strip()
+        if not query:
+            return self.frequent(session, limit)
+        prefix = _like_escape(query) + '%'
+        with self._lock:
+            if self.fts and len(query) >= 3:
+                rows = self._conn.execute(
+                    "SELECT c.command, c.count FROM commands_fts f JOIN commands c ON c.id = f.rowid "
+                    "WHERE commands_fts MATCH ? AND c.session = ? "
+                    "ORDER BY c.command LIKE ? ESCAPE '\\' DESC, c.count DESC, c.last_used DESC LIMIT ?",
+                    ('"' + query.replace('"', '""') + '"', session, prefix, limit)).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT command, count FROM commands WHERE session = ? AND command LIKE ? ESCAPE '\\' "
+                    "ORDER BY command LIKE ? ESCAPE '\\' DESC, count DESC, last_used DESC LIMIT ?",
+                    (session, '%' + _like_escape(query) + '%', prefix, limit)).fetchall()
+            if not rows:
+                rows = self._fuzzy(session, query, limit)
+        return [{'command': r[0], 'count': r[1]} for r in rows]
+
+    def clear(self, session):
+        with self._lock:
+            self._conn.execute('DELETE FROM history WHERE session = ?', (session,))
+            self._conn.execute('DELETE FROM commands WHERE session = ?', (session,))
+            self._conn.commit()
+
+    def _fuzzy(self, session, query, limit):
+        # Caller holds the lock; match query characters in order, e.g. "gpr" -> "grep pattern readme.txt"
+        needle = query.lower()
+        matches = []
+        cur = self._conn.execute(
+            'SELECT command, count FROM commands WHERE session = ? ORDER BY count DESC, last_used DESC LIMIT ?',
+            (session, FUZZY_SCAN_LIMIT))
+        for command, count in cur:
+            it = iter(command.lower())
+            if all(ch in it for ch in needle):
+                matches.append((command, count))
+                if len(matches) >= limit:
+                    break
+        return matches
+
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
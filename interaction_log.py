@@ -0,0 +1,143 @@
+import os
+import json
+import random
+import atexit
+import tempfile
+import threading
+from collections import deque
+
+# --- Bounded AI interaction log: in-memory ring buffer + batched JSONL writer with rotation ---
+
+AI_LOG_PATH = os.environ.get('AI_LOG_PATH', os.path.join(tempfile.gettempdir(), 'pyterminal_ai_log.jsonl'))
+AI_LOG_CAPACITY = int(os.environ.get('AI_LOG_CAPACITY', 500))
+AI_LOG_SAMPLE_RATE = float(os.environ.get('AI_LOG_SAMPLE_RATE', 0.05))
+
+
+class InteractionLog:
+    def __init__(self, path=AI_LOG_PATH, capacity=AI_LOG_CAPACITY, sample_rate=AI_LOG_SAMPLE_RATE,
+                 batch_size=50, flush_interval=2.0, max_bytes=5 * 1024 * 1024, backups=3):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        # Both buffers are fixed-size, so memory stays flat even if the disk is slow
+        self._recent = deque(maxlen=capacity)
+        self._pending = deque()
+        self._pending_limit = capacity * 4
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._load_recent()
+        atexit.register(self.close)
+
+    def append(self, entry):
+        entry = dict(entry)
+        # Raw Gemini payloads are large; keep them only for a sampled fraction of calls
+        if 'raw' in entry and random.random() >= self.sample_rate:
+            entry.pop('raw')
+        with self._cond:
+            self._recent.append(entry)
+            if len(self._pending) >= self._pending_limit:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        self._ensure_writer()
+
+    def recent(self, limit=20, session=None):
+        with self._cond:
+            items = list(self._recent)
+        if session is not None:
+            items = [entry for entry in items if entry.get('session') == session]
+        if limit <= 0:
+            return []
+        return items[-limit:]
+
+    def __len__(self):
+        return len(self._recent)
+
+    def flush(self):
+        with self._cond:
+            batch = list(self._pending)
+            self._pending.clear()
+        self._write(batch)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+    def _ensure_writer(self):
+        # Restart the writer lazily, e.g. in a gunicorn worker forked after import
+        if self._closed:
+            return
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='ai-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._pending) < self.batch_size and not self._closed:
+                    self._cond.wait(timeout=self.flush_interval)
+                batch = list(self._pending)
+                self._pending.clear()
+                closed = self._closed
+            self._write(batch)
+            if closed:
+                return
+
+    def _write(self, batch):
+        if not batch:
+            return
+        data = ''.join(json.dumps(entry, default=str) + '\n' for entry in batch)
+        try:
+            self._rotate_if_needed(len(data))
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+        except Exception as e:
+            print(f"[InteractionLog] [ERROR] Failed to write {len(batch)} entries to {self.path}: {e}")
+
+    def _rotate_if_needed(self, incoming):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        for i in range(self.backups - 1, 0, -1):
+            src = f'{self.path}.{i}'
+            if os.path.exists(src):
+                os.replace(src, f'{self.path}.{i + 1}')
+        if self.backups > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def _load_recent(self):
+        # Warm the ring buffer from the tail of the log so history survives restarts
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                tail = deque(f, maxlen=self._recent.maxlen)
+            for line in tail:
+                try:
+                    self._recent.append(json.loads(line))
+                except ValueError:
+                    continue
+        except Exception as e:
+            print(f"[InteractionLog] [WARN] Could not load {self.path}: {e}")
@@ -1,5 +1,3 @@
-let history = [];
-let historyIdx = -1;
 let executedCommands = [];
 let openTabs = [];
 let activeTab = null;
@@ -12,6 +10,10 @@ let aiPromptSuggestTimeout = null;
 let lastAiPromptSuggestInput = '';
 let lastAiPromptSuggestResult = '';
 let lastAiPromptRequestId = 0;
+let nextTerminalId = 1;
+let frequentCommands = [];
+let reverseSearch = null;
+let reverseSearchTimeout = null;
 let terminals = [createTerminalSession()];
 let activeTerminal = 0;
 let lastCwdForFiles = '';
@@ -19,8 +21,10 @@ let cachedFiles = [];
 
 function createTerminalSession() {
   return {
+    id: String(nextTerminalId++),
     history: [],
     historyIdx: 0,
+    historySyncedId: 0,
     executedCommands: [],
     cwd: '~',
     aiMode: aiMode,
@@ -56,6 +60,7 @@ function renderTerminalTabs() {
   newBtn.onclick = () => {
     terminals.push(createTerminalSession());
     activeTerminal = terminals.length - 1;
+    syncHistory(terminals[activeTerminal]);
     renderTerminalTabs();
     renderTerminalSession();
   };
@@ -137,14 +142,25 @@ function setAiMode(on) {
   terminals[activeTerminal].aiMode = on;
 }
 
-function saveHistory() {
-  localStorage.setItem('cmdHistory', JSON.stringify(history));
+// History lives on the server; only fetch entries newer than the last one we have
+function syncHistory(term) {
+  fetch('/history?terminal=' + encodeURIComponent(term.id) + '&after=' + term.historySyncedId)
+    .then(res => res.json())
+    .then(data => {
+      (data.entries || []).forEach(entry => {
+        term.history.push(entry.command);
+        term.historySyncedId = entry.id;
+      });
+      term.historyIdx = term.history.length;
+    });
 }
-function loadHistory() {
-  const h = localStorage.getItem('cmdHistory');
-  if (h) history = JSON.parse(h);
-  else history = [];
-  historyIdx = history.length;
+
+function loadFrequentCommands() {
+  fetch('/history/search?q=&limit=50')
+    .then(res => res.json())
+    .then(data => {
+      frequentCommands = (data.results || []).map(r => r.command);
+    });
 }
 
 const SUGGESTION_TEMPLATES = [
@@ -175,6 +191,10 @@ const SUGGESTION_TEMPLATES = [
   'tree',
   'nano <file>',
   'open <file>',
+  'tar -czf <archive.tgz> <folder>',
+  'tar -xf <archive>',
+  'zip -r <archive.zip> <folder>',
+  'unzip <archive.zip>',
   'whoami',
   'hostname',
   'uname -a',
@@ -183,10 +203,15 @@ const SUGGESTION_TEMPLATES = [
   'df -h',
   'free -h',
   'date',
+  'history',
+  'history -f',
+  'history -s <query>',
   'clear',
   'ps aux',
   'tasklist',
   'top',
+  'top -n <count> -o mem',
+  'ps -C <name>',
   'htop',
   'kill <pid>',
   'taskkill /PID <id> /F',
@@ -270,6 +295,24 @@ function aiPromptSuggest(input, cb) {
     });
 }
 
+function measureInputText(input, text) {
+  // Use a hidden span to measure the width of the input value for precise left offset
+  let measurer = document.getElementById('input-width-measurer');
+  if (!measurer) {
+    measurer = document.createElement('span');
+    measurer.id = 'input-width-measurer';
+    measurer.style.visibility = 'hidden';
+    measurer.style.position = 'absolute';
+    measurer.style.whiteSpace = 'pre';
+    measurer.style.fontFamily = 'inherit';
+    measurer.style.fontSize = '1em';
+    measurer.style.fontStyle = 'inherit';
+    input.parentNode.appendChild(measurer);
+  }
+  measurer.textContent = text;
+  return measurer.offsetWidth;
+}
+
 function showInlineAutocomplete(suggestion) {
   const input = document.getElementById('terminal-input');
   let ghost = document.getElementById('inline-autocomplete');
@@ -298,21 +341,7 @@ function showInlineAutocomplete(suggestion) {
     return;
   }
   if (suggestion && suggestion !== val && suggestion.startsWith(val)) {
-    // Use a hidden span to measure the width of the input value for precise left offset
-    let measurer = document.getElementById('input-width-measurer');
-    if (!measurer) {
-      measurer = document.createElement('span');
-      measurer.id = 'input-width-measurer';
-      measurer.style.visibility = 'hidden';
-      measurer.style.position = 'absolute';
-      measurer.style.whiteSpace = 'pre';
-      measurer.style.fontFamily = 'inherit';
-      measurer.style.fontSize = '1em';
-      measurer.style.fontStyle = 'inherit';
-      input.parentNode.appendChild(measurer);
-    }
-    measurer.textContent = val;
-    const offset = measurer.offsetWidth;
+    const offset = measureInputText(input, val);
     ghost.textContent = suggestion.slice(val.length);
     ghost.style.display = 'inline';
     ghost.style.left = offset + 'px';
@@ -357,26 +386,114 @@ function hideInlineAutocomplete() {
   inlineSuggestion = '';
 }
 
+// Ctrl+R: reverse search over server-side history, ranked by frequency
+function startReverseSearch() {
+  const input = document.getElementById('terminal-input');
+  if (!reverseSearch) {
+    reverseSearch = { results: [], idx: 0, original: input.value };
+    input.value = '';
+    input.placeholder = '(reverse-i-search)';
+    hideInlineAutocomplete();
+  } else if (reverseSearch.results.length) {
+    // Ctrl+R again cycles to the next match
+    reverseSearch.idx = (reverseSearch.idx + 1) % reverseSearch.results.length;
+    showReverseSearchMatch();
+  }
+}
+
+function updateReverseSearch() {
+  if (reverseSearchTimeout) clearTimeout(reverseSearchTimeout);
+  reverseSearchTimeout = setTimeout(() => {
+    const query = document.getElementById('terminal-input').value;
+    fetch('/history/search?q=' + encodeURIComponent(query) + '&limit=20')
+      .then(res => res.json())
+      .then(data => {
+        if (!reverseSearch) return;
+        reverseSearch.results = (data.results || []).map(r => r.command);
+        reverseSearch.idx = 0;
+        showReverseSearchMatch();
+      });
+  }, 150);
+}
+
+function showReverseSearchMatch() {
+  const input = document.getElementById('terminal-input');
+  const ghost = document.getElementById('inline-autocomplete');
+  if (!ghost || !reverseSearch) return;
+  const match = reverseSearch.results[reverseSearch.idx];
+  ghost.textContent = match ? '  \u2192 ' + match : (input.value ? '  [no match]' : '');
+  ghost.style.display = 'inline';
+  ghost.style.left = measureInputText(input, input.value) + 'px';
+}
+
+function finishReverseSearch(accept) {
+  const input = document.getElementById('terminal-input');
+  const match = reverseSearch.results[reverseSearch.idx];
+  input.value = accept && match ? match : reverseSearch.original;
+  input.placeholder = '';
+  reverseSearch = null;
+  if (reverseSearchTimeout) clearTimeout(reverseSearchTimeout);
+  hideInlineAutocomplete();
+}
+
+function handleReverseSearchKey(e) {
+  const key = e.key.toLowerCase();
+  if (e.ctrlKey && key === 'r') {
+    startReverseSearch();
+    e.preventDefault();
+    return true;
+  }
+  if (e.key === 'Escape' || (e.ctrlKey && (key === 'c' || key === 'g'))) {
+    finishReverseSearch(false);
+    e.preventDefault();
+    return true;
+  }
+  if (e.key === 'Enter') {
+    // Accept the match and run it, like bash
+    finishReverseSearch(true);
+    return false;
+  }
+  if (e.key === 'Tab' || e.key === 'ArrowUp' || e.key === 'ArrowDown' || e.key === 'ArrowLeft' || e.key === 'ArrowRight') {
+    finishReverseSearch(true);
+    e.preventDefault();
+    return true;
+  }
+  updateReverseSearch();
+  return true;
+}
+
 function handleInput(e) {
   const term = terminals[activeTerminal];
   aiMode = term.aiMode;
   const input = document.getElementById('terminal-input');
+  if (reverseSearch && handleReverseSearchKey(e)) return;
   if (e.key === 'Enter') {
     hideInlineAutocomplete();
     const cmd = input.value.trim();
     if (!cmd) return;
     term.history.push(cmd);
-    saveHistory();
     term.historyIdx = term.history.length;
+    const ranked = !aiMode;
     addOutput(document.querySelector('.terminal-prompt').textContent + ' ' + cmd);
     input.value = '';
     fetch('/execute', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ command: cmd, ai: aiMode })
+      body: JSON.stringify({ command: cmd, ai: aiMode, terminal: term.id, record: true })
     })
     .then(res => res.json())
     .then(data => {
+      if (data.history_id) term.historySyncedId = Math.max(term.historySyncedId, data.history_id);
+      // Re-read the server ranking rather than reordering locally, so autocomplete stays frequency-ranked
+      if (ranked) loadFrequentCommands();
+      if (data.history_cleared) {
+        // history -c clears the whole session on the server, so drop every tab's local copy too
+        terminals.forEach(t => {
+          t.history = [];
+          t.historyIdx = 0;
+        });
+        frequentCommands = [];
+      }
       if (data.output) addOutput(data.output);
       else if (data.suggestion) addOutput('[AI Suggestion] ' + data.suggestion);
       fetchCwd();
@@ -399,6 +516,9 @@ function handleInput(e) {
       term.historyIdx = term.history.length;
     }
     e.preventDefault();
+  } else if (e.ctrlKey && e.key.toLowerCase() === 'r') {
+    startReverseSearch();
+    e.preventDefault();
   } else if (e.ctrlKey && e.key.toLowerCase() === 'l') {
     hideInlineAutocomplete();
     addOutput('[[CLEAR]]');
@@ -433,7 +553,7 @@ function handleInput(e) {
       }, 800);
     } else {
       getCurrentDirFiles(files => {
-        const suggestion = bestStaticSuggestion(val, SUGGESTION_TEMPLATES, files);
+        const suggestion = bestStaticSuggestion(val, frequentCommands.concat(SUGGESTION_TEMPLATES), files);
         showInlineAutocomplete(suggestion);
       });
     }
@@ -574,7 +694,8 @@ function pollSysStats() {
 }
 
 document.addEventListener('DOMContentLoaded', () => {
-  loadHistory();
+  syncHistory(terminals[activeTerminal]);
+  loadFrequentCommands();
   document.getElementById('terminal-input').addEventListener('keydown', handleInput);
   document.getElementById('terminal-input').focus();
   fetchFileTree();
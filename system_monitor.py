@@ -1,13 +1,69 @@
 import psutil
 import platform
 import time
+import threading
 from datetime import datetime
 
 # --- Hackathon-winning: Real-time system stats, cross-platform, clean output, timestamps ---
 
+class ProcessSnapshot:
+    # Keeps psutil.Process objects between samples so cpu_percent() measures a real delta,
+    # and refreshes at most once per interval no matter how many callers ask
+    def __init__(self, interval=1.0, prime_delay=0.1):
+        self.interval = interval
+        self.prime_delay = prime_delay
+        self._procs = {}
+        self._rows = ()
+        self._taken = None
+        self._lock = threading.Lock()
+
+    def rows(self):
+        with self._lock:
+            if self._taken is None or time.monotonic() - self._taken >= self.interval:
+                self._refresh()
+            return self._rows
+
+    def _refresh(self):
+        primed = bool(self._procs)
+        pids = set(psutil.pids())
+        for pid in list(self._procs):
+            if pid not in pids:
+                del self._procs[pid]
+        for pid in pids:
+            proc = self._procs.get(pid)
+            if proc is not None and proc.is_running():
+                continue
+            try:
+                proc = psutil.Process(pid)
+                proc.cpu_percent(None)
+                self._procs[pid] = proc
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                self._procs.pop(pid, None)
+        if not primed:
+            # First sample has no baseline; wait briefly so CPU% is not all zeros
+            time.sleep(self.prime_delay)
+        rows = []
+        for pid, proc in list(self._procs.items()):
+            try:
+                with proc.oneshot():
+                    rows.append({
+                        'pid': pid,
+                        'name': proc.name(),
+                        'cpu': proc.cpu_percent(None),
+                        'mem': proc.memory_percent(),
+                    })
+            except psutil.NoSuchProcess:
+                del self._procs[pid]
+            except psutil.AccessDenied:
+                continue
+        self._rows = tuple(rows)
+        self._taken = time.monotonic()
+
+
 class SystemMonitor:
     def __init__(self):
         self.history = []
+        self.procs = ProcessSnapshot()
 
     def sysinfo(self):
         info = {
@@ -19,19 +75,25 @@ class SystemMonitor:
         }
         return self._format(info)
 
-    def top(self, n=5):
-        procs = [(p.info['pid'], p.info['name'], p.info['cpu_percent'])
-                 for p in psutil.process_iter(['pid', 'name', 'cpu_percent'])]
-        procs.sort(key=lambda x: x[2], reverse=True)
-        lines = [f"PID   NAME         CPU%"]
-        for pid, name, cpu in procs[:n]:
-            lines.append(f"{pid:<5} {name[:12]:<12} {cpu:>5}")
+    def top(self, n=5, sort='cpu'):
+        procs = sorted(self.procs.rows(), key=lambda p: p[sort], reverse=True)
+        lines = [f"PID   NAME          CPU%  MEM%"]
+        for p in procs[:n]:
+            lines.append(f"{p['pid']:<5} {p['name'][:12]:<12} {p['cpu']:>5.1f} {p['mem']:>5.1f}")
         return '\n'.join(lines)
 
-    def ps(self):
-        lines = [f"PID   NAME"]
-        for p in psutil.process_iter(['pid', 'name']):
-            lines.append(f"{p.info['pid']:<5} {p.info['name']}")
+    def ps(self, name=None, sort=None):
+        procs = self.procs.rows()
+        if name:
+            # Exact command name, like ps -C
+            procs = [p for p in procs if p['name'] == name]
+        if sort:
+            procs = sorted(procs, key=lambda p: p[sort], reverse=True)
+        else:
+            procs = sorted(procs, key=lambda p: p['pid'])
+        lines = [f"PID    CPU%  MEM%  NAME"]
+        for p in procs:
+            lines.append(f"{p['pid']:<5} {p['cpu']:>5.1f} {p['mem']:>5.1f}  {p['name']}")
         return '\n'.join(lines)
 
     def df(self):